@@ -1,252 +1,384 @@
-# Import libraries
-import streamlit as st  # Web app framework
-import pandas as pd     # Data handling
-import random          # Random numbers
-from datetime import datetime  # Time functions
-
-# Page setup
-st.set_page_config(
-    page_title="🚌 Bus Delay Predictor",
-    page_icon="🚌",
-    layout="wide"
-)
-
-# Load bus data from CSV files
-@st.cache_data  # Cache for better performance
-def load_bus_data():
-    """Load bus route and stop data"""
-    try:
-        routes = pd.read_csv('GRT_Routes (1).csv')
-        stops = pd.read_csv('GRT_Stops (1).csv')
-        return routes, stops
-    except:
-        st.error("❌ Could not find the CSV files! Make sure they're in the same folder.")
-        return None, None
-
-# Simulate weather conditions
-def get_current_weather():
-    """Get random weather and its delay impact"""
-    weather_options = [
-        ("☀️ Sunny", 1.0),           # No delay
-        ("☁️ Cloudy", 1.1),          # 10% more delay  
-        ("🌧️ Light Rain", 1.3),      # 30% more delay
-        ("⛈️ Heavy Rain", 1.6),       # 60% more delay
-        ("❄️ Snow", 1.8),            # 80% more delay
-        ("🧊 Ice/Freezing", 2.0)     # 100% more delay
-    ]
-    
-    weather_name, delay_factor = random.choice(weather_options)
-    return weather_name, delay_factor
-
-# Check if it's rush hour
-def is_rush_hour():
-    """Check if current time is rush hour"""
-    current_hour = datetime.now().hour
-    
-    # Rush hour: 7-9 AM and 4-6 PM
-    if (7 <= current_hour <= 9) or (16 <= current_hour <= 18):
-        return True, "⏰ Rush Hour", 1.4  # 40% more delay
-    else:
-        return False, "😌 Regular Time", 1.0  # Normal delay
-
-# Calculate bus delay
-def predict_delay(route_number, route_name, route_length):
-    """Calculate expected bus delay"""
-    
-    # Base delay: longer routes = more delays
-    base_delay = route_length * 0.3  # 0.3 minutes per km
-    
-    # Get weather and time factors
-    weather, weather_factor = get_current_weather()
-    is_rush, time_period, time_factor = is_rush_hour()
-    
-    # Add random factors (construction, accidents, etc.)
-    random_factor = random.uniform(0.7, 1.8)
-    
-    # Calculate total delay
-    total_delay = base_delay * weather_factor * time_factor * random_factor
-    delay_minutes = round(total_delay)
-    
-    return {
-        'delay_minutes': delay_minutes,
-        'weather': weather,
-        'weather_factor': weather_factor,
-        'time_period': time_period,
-        'time_factor': time_factor,
-        'base_delay': round(base_delay, 1),
-        'is_rush': is_rush
-    }
-
-# Main app
-def main():
-    # App title
-    st.title("🚌 Waterloo Region Bus Delay Predictor")
-    st.write("Find out how late your bus might be today!")
-    
-    # Load data
-    routes_data, stops_data = load_bus_data()
-    
-    if routes_data is None:
-        st.stop()  # Stop if no data
-    
-    # Sidebar info
-    st.sidebar.header("📊 Data Info")
-    st.sidebar.write(f"📍 Total bus routes: {len(routes_data)}")
-    st.sidebar.write(f"🚏 Total bus stops: {len(stops_data)}")
-    
-    # Create two columns
-    col1, col2 = st.columns([1, 1])
-    
-    with col1:
-        st.header("🔍 Select Your Bus Route")
-        
-        # Prepare route options
-        unique_routes = routes_data[['Route', 'FullName']].drop_duplicates()
-        unique_routes = unique_routes.sort_values('Route')
-        
-        route_options = {}
-        for _, row in unique_routes.iterrows():
-            route_options[f"Route {row['Route']} - {row['FullName']}"] = row['Route']
-        
-        # Route selection dropdown
-        selected_route_text = st.selectbox(
-            "Choose your bus route:",
-            options=list(route_options.keys()),
-            help="Pick the bus route you want to take"
-        )
-        
-        selected_route = route_options[selected_route_text]
-        
-        # Predict button
-        if st.button("🔮 Predict My Bus Delay!", type="primary"):
-            # Get route info
-            route_info = routes_data[routes_data['Route'] == selected_route].iloc[0]
-            route_name = route_info['FullName']
-            route_length = route_info['Length']
-            
-            # Make prediction
-            prediction = predict_delay(selected_route, route_name, route_length)
-            
-            # Store in session state
-            st.session_state.prediction = prediction
-            st.session_state.route_info = {
-                'number': selected_route,
-                'name': route_name,
-                'length': route_length
-            }
-    
-    with col2:
-        st.header("📈 Current Conditions")
-        
-        # Current time
-        current_time = datetime.now().strftime("%I:%M %p")
-        st.metric("🕐 Current Time", current_time)
-        
-        # Rush hour status
-        is_rush, time_period, time_factor = is_rush_hour()
-        rush_color = "🔴" if is_rush else "🟢"
-        st.metric("⏰ Traffic Status", f"{rush_color} {time_period}")
-        
-        # Weather
-        weather, weather_factor = get_current_weather()
-        st.metric("🌤️ Weather Impact", weather)
-    
-    # Show prediction results
-    if 'prediction' in st.session_state:
-        st.header("🎯 Your Bus Delay Prediction")
-        
-        prediction = st.session_state.prediction
-        route_info = st.session_state.route_info
-        
-        # Determine delay status
-        delay = prediction['delay_minutes']
-        if delay <= 2:
-            status_color = "🟢"
-            status_text = "ON TIME"
-        elif delay <= 5:
-            status_color = "🟡"
-            status_text = "SLIGHTLY LATE"
-        elif delay <= 10:
-            status_color = "🟠"
-            status_text = "MODERATELY LATE"
-        else:
-            status_color = "🔴"
-            status_text = "VERY LATE"
-        
-        # Display delay
-        st.metric(
-            label=f"{status_color} Route {route_info['number']} - {route_info['name']}",
-            value=f"{delay} minutes late",
-            delta=f"Status: {status_text}"
-        )
-        
-        # Explanation
-        st.subheader("🧠 Why This Prediction?")
-        
-        exp_col1, exp_col2 = st.columns([1, 1])
-        
-        with exp_col1:
-            st.write("**🛣️ Route Information:**")
-            st.write(f"• Length: {route_info['length']:.1f} km")
-            st.write(f"• Base delay: {prediction['base_delay']} minutes")
-            st.write(f"  (longer routes = more delays)")
-            
-            st.write("**🌤️ Weather Impact:**")
-            st.write(f"• Today's weather: {prediction['weather']}")
-            weather_impact = round((prediction['weather_factor'] - 1) * 100)
-            if weather_impact > 0:
-                st.write(f"• Adds {weather_impact}% more delay")
-            else:
-                st.write(f"• No weather delays today! 🎉")
-        
-        with exp_col2:
-            st.write("**⏰ Time Impact:**")
-            st.write(f"• Current period: {prediction['time_period']}")
-            time_impact = round((prediction['time_factor'] - 1) * 100)
-            if time_impact > 0:
-                st.write(f"• Adds {time_impact}% more delay")
-            else:
-                st.write(f"• Good timing! No rush hour delays")
-            
-            st.write("**🎲 Random Factors:**")
-            st.write("• Construction work")
-            st.write("• Traffic accidents") 
-            st.write("• Extra passengers")
-            st.write("• Driver breaks")
-        
-        # Delay breakdown chart
-        st.subheader("📊 Delay Breakdown")
-        
-        factors = {
-            'Base Route Delay': prediction['base_delay'],
-            'Weather Effect': prediction['base_delay'] * (prediction['weather_factor'] - 1),
-            'Time Effect': prediction['base_delay'] * (prediction['time_factor'] - 1),
-            'Random Factors': delay - prediction['base_delay'] * prediction['weather_factor'] * prediction['time_factor']
-        }
-        
-        # Remove negative values
-        factors = {k: max(0, v) for k, v in factors.items()}
-        
-        # Show chart
-        if sum(factors.values()) > 0:
-            st.bar_chart(factors)
-        
-        # Tips for users
-        st.subheader("💡 Tips for Your Journey")
-        
-        if delay <= 2:
-            st.success("✅ Great timing! Your bus should be on schedule.")
-        elif delay <= 5:
-            st.warning("⚠️ Minor delays possible. Consider leaving 5 minutes early.")
-        elif delay <= 10:
-            st.warning("⚠️ Moderate delays expected. Leave 10-15 minutes early.")
-        else:
-            st.error("🚨 Significant delays likely. Consider alternate routes or leave much earlier.")
-        
-        # Departure recommendation
-        if delay > 2:
-            st.info(f"💡 **Recommendation:** Leave {delay + 5} minutes earlier than usual to arrive on time!")
-
-# Run the app
-if __name__ == "__main__":
-    main()
+# Import libraries
+import streamlit as st  # Web app framework
+import pandas as pd     # Data handling
+import numpy as np      # Fast array math
+import os              # File checks for the Parquet sidecar
+import time            # For cache time windows
+import functools       # Lightweight in-process caching
+import bisect          # Threshold table lookups
+from datetime import datetime  # Time functions
+
+# Numba compiles the batch kernel; fall back to plain NumPy without it
+try:
+    from numba import njit
+except:
+    def njit(*args, **kwargs):
+        return lambda func: func
+
+# Page setup
+st.set_page_config(
+    page_title="🚌 Bus Delay Predictor",
+    page_icon="🚌",
+    layout="wide"
+)
+
+# Count data rows in a CSV without parsing it
+def _fast_line_count(path):
+    """Count newlines in 1 MB chunks, minus the header row"""
+    with open(path, 'rb') as f:
+        return sum(chunk.count(b'\n') for chunk in iter(lambda: f.read(1 << 20), b'')) - 1
+
+# Load bus data from CSV files
+@st.cache_data  # Cache for better performance
+def load_bus_data():
+    """Load bus route data and count the stops"""
+    try:
+        # Parquet sidecar: after the first run, cold starts skip CSV
+        # parsing and get the saved dtypes back for free
+        if os.path.exists('GRT_Routes.parquet'):
+            routes = pd.read_parquet('GRT_Routes.parquet')
+        else:
+            # Only read the columns we actually use, with explicit dtypes
+            routes = pd.read_csv(
+                'GRT_Routes (1).csv',
+                usecols=['Route', 'FullName', 'Length'],
+                dtype={'Route': 'int32', 'FullName': 'string', 'Length': 'float32'}
+            )
+            try:
+                routes.to_parquet('GRT_Routes.parquet')
+            except:
+                pass  # No Parquet engine installed - CSV still works
+        # ~60 distinct routes: categorical codes make grouping and
+        # equality checks integer-cheap and halve the column's memory.
+        # Applied after the if/else because the categorical dtype does
+        # not survive the Parquet round-trip
+        routes['Route'] = routes['Route'].astype('category')
+        # Stops are only counted, so scan raw bytes instead of parsing
+        stops_count = _fast_line_count('GRT_Stops (1).csv')
+        return routes, stops_count
+    except:
+        st.error("❌ Could not find the CSV files! Make sure they're in the same folder.")
+        return None, None
+
+# Build the dropdown options for the route picker
+def build_route_options(routes):
+    """Build the dropdown labels, a label -> route number map,
+    and a route number -> info map for O(1) lookups"""
+    # One sorted groupby pass instead of drop_duplicates + sort_values.
+    # Deliberately one entry per route number: a few routes carry two
+    # FullNames, but both labels resolved to the same route info anyway,
+    # so we keep only the first name per route
+    unique_routes = routes.groupby('Route', sort=True)['FullName'].first().reset_index()
+
+    # Vectorized label build, no per-row Python loop
+    labels = 'Route ' + unique_routes['Route'].astype('string') + ' - ' + unique_routes['FullName']
+    route_options = dict(zip(labels, unique_routes['Route']))
+
+    # Fast-access map so the predict button doesn't scan the DataFrame
+    route_info_map = (
+        routes.drop_duplicates('Route')
+        .set_index('Route')[['FullName', 'Length']]
+        .to_dict('index')
+    )
+
+    return list(route_options.keys()), route_options, route_info_map
+
+# Shared route index (labels + lookup dicts)
+@st.cache_resource  # One shared object for all sessions, no copy per hit
+def get_route_index():
+    """Build the route index once and share it across sessions"""
+    routes, _ = load_bus_data()
+    return build_route_options(routes)
+
+# Weather lookup tables and shared NumPy RNG
+WEATHER_NAMES = (
+    "☀️ Sunny",          # No delay
+    "☁️ Cloudy",         # 10% more delay
+    "🌧️ Light Rain",     # 30% more delay
+    "⛈️ Heavy Rain",      # 60% more delay
+    "❄️ Snow",           # 80% more delay
+    "🧊 Ice/Freezing"    # 100% more delay
+)
+WEATHER_FACTORS = np.array([1.0, 1.1, 1.3, 1.6, 1.8, 2.0])
+rng = np.random.default_rng()
+
+# Names for the delay breakdown chart
+FACTOR_NAMES = ['Base Route Delay', 'Weather Effect', 'Time Effect', 'Random Factors']
+
+# Delay status table: at most 2/5/10 minutes late for each label
+DELAY_THRESHOLDS = (2, 5, 10)
+DELAY_STATUS = (
+    ("🟢", "ON TIME"),
+    ("🟡", "SLIGHTLY LATE"),
+    ("🟠", "MODERATELY LATE"),
+    ("🔴", "VERY LATE")
+)
+
+# Current 10-minute window, used as the weather cache key
+def weather_bucket():
+    """Bucket the clock into 10-minute windows"""
+    return int(time.time() // 600)
+
+# Simulate weather conditions
+@functools.lru_cache(maxsize=1)  # Same tuple back for the whole window
+def get_current_weather(bucket):
+    """Get random weather and its delay impact for a 10-minute window"""
+    # Seed from the window so every call in it picks the same weather
+    # (keeps the UI and prediction consistent)
+    idx = np.random.default_rng(bucket).integers(len(WEATHER_FACTORS))
+    return WEATHER_NAMES[idx], float(WEATHER_FACTORS[idx])
+
+# Check if it's rush hour
+@functools.lru_cache(maxsize=1)  # Free within the same hour
+def is_rush_hour(current_hour):
+    """Check if the given hour is rush hour"""
+    # Rush hour: 7-9 AM and 4-6 PM
+    if (7 <= current_hour <= 9) or (16 <= current_hour <= 18):
+        return True, "⏰ Rush Hour", 1.4  # 40% more delay
+    else:
+        return False, "😌 Regular Time", 1.0  # Normal delay
+
+# Calculate bus delay
+@st.cache_data(ttl=600, show_spinner=False)  # Repeat clicks hit the cache
+def predict_delay(route_number, route_name, route_length, bucket, current_hour):
+    """Calculate expected bus delay for a weather window and hour
+
+    bucket and current_hour are arguments (not read inside) so they are
+    part of the cache key: a new weather window or hour always computes
+    a fresh prediction instead of serving the old one until the ttl ends.
+    """
+    # Base delay: longer routes = more delays
+    base_delay = route_length * 0.3  # 0.3 minutes per km
+
+    # Get weather and time factors
+    weather, weather_factor = get_current_weather(bucket)
+    is_rush, time_period, time_factor = is_rush_hour(current_hour)
+
+    # Add random factors (construction, accidents, etc.)
+    # Seeded per route and 10-minute window, so the result is stable
+    # and the function is safe to cache
+    jitter = np.random.default_rng(hash((route_number, bucket)) & 0xFFFFFFFF)
+    random_factor = jitter.uniform(0.7, 1.8)
+    
+    # Calculate total delay
+    total_delay = base_delay * weather_factor * time_factor * random_factor
+    delay_minutes = round(total_delay)
+    
+    return {
+        'delay_minutes': delay_minutes,
+        'weather': weather,
+        'weather_factor': weather_factor,
+        'time_period': time_period,
+        'time_factor': time_factor,
+        'base_delay': round(base_delay, 1),
+        'is_rush': is_rush
+    }
+
+# Compiled kernel for the batch delay formula
+@njit(cache=True)
+def predict_batch(lengths, weather_factors, time_factor, random_factors):
+    """Apply the delay formula to whole arrays in one compiled pass"""
+    return np.round(lengths * 0.3 * weather_factors * time_factor * random_factors)
+
+# Predict delays for many routes at once
+def predict_all(route_lengths):
+    """Vectorized delay prediction for a batch of route lengths"""
+    _, _, time_factor = is_rush_hour(datetime.now().hour)
+
+    lengths = np.asarray(route_lengths, dtype=float)
+    weather_factors = WEATHER_FACTORS[rng.integers(len(WEATHER_FACTORS), size=lengths.size)]
+    random_factors = rng.uniform(0.7, 1.8, size=lengths.size)
+
+    # Same formula as predict_delay, one kernel call instead of a route loop
+    return predict_batch(lengths, weather_factors, time_factor, random_factors)
+
+# Build the delay breakdown chart data as an Arrow table
+@st.cache_data(show_spinner=False)  # One table per distinct prediction
+def factors_to_arrow(base_delay, weather_factor, time_factor, delay):
+    """Precompute the breakdown table Streamlit sends to the chart"""
+    import pyarrow as pa
+
+    # One vectorized computation for all four factors
+    values = np.array([
+        base_delay,
+        base_delay * (weather_factor - 1),
+        base_delay * (time_factor - 1),
+        delay - base_delay * weather_factor * time_factor
+    ])
+    values = np.clip(values, 0, None)  # Remove negative values
+    return pa.table({'Factor': FACTOR_NAMES, 'Minutes': values})
+
+# Route picker column
+@st.fragment  # Only this subtree reruns on dropdown/button interaction
+def route_picker():
+    """Route dropdown and predict button"""
+    st.header("🔍 Select Your Bus Route")
+
+    # Prepare route options (shared resource, so reruns skip the rebuild)
+    route_labels, route_options, route_info_map = get_route_index()
+
+    # Route selection dropdown
+    selected_route_text = st.selectbox(
+        "Choose your bus route:",
+        options=route_labels,
+        help="Pick the bus route you want to take"
+    )
+
+    selected_route = route_options[selected_route_text]
+
+    # Predict button
+    if st.button("🔮 Predict My Bus Delay!", type="primary"):
+        # Get route info (O(1) dict lookup, no DataFrame scan)
+        route_info = route_info_map[selected_route]
+        route_name = route_info['FullName']
+        route_length = route_info['Length']
+
+        # Make prediction
+        prediction = predict_delay(
+            selected_route, route_name, route_length,
+            weather_bucket(), datetime.now().hour
+        )
+
+        # Store in session state
+        st.session_state.prediction = prediction
+        st.session_state.route_info = {
+            'number': selected_route,
+            'name': route_name,
+            'length': route_length
+        }
+
+        # The results section lives outside this fragment, so ask for
+        # one full rerun to show the new prediction
+        st.rerun(scope="app")
+
+# Render the prediction results section
+@st.fragment  # Redraws independently of the rest of the script
+def render_prediction(prediction, route_info):
+    """Show the delay prediction, explanation, chart and tips"""
+    st.header("🎯 Your Bus Delay Prediction")
+
+    # Determine delay status with one table lookup
+    delay = prediction['delay_minutes']
+    status_color, status_text = DELAY_STATUS[bisect.bisect_left(DELAY_THRESHOLDS, delay)]
+    
+    # Display delay
+    st.metric(
+        label=f"{status_color} Route {route_info['number']} - {route_info['name']}",
+        value=f"{delay} minutes late",
+        delta=f"Status: {status_text}"
+    )
+    
+    # Explanation
+    st.subheader("🧠 Why This Prediction?")
+    
+    exp_col1, exp_col2 = st.columns([1, 1])
+    
+    with exp_col1:
+        # One Markdown block = one message to the frontend
+        weather_impact = round((prediction['weather_factor'] - 1) * 100)
+        if weather_impact > 0:
+            weather_line = f"Adds {weather_impact}% more delay"
+        else:
+            weather_line = "No weather delays today! 🎉"
+        st.markdown(f"""**🛣️ Route Information:**
+- Length: {route_info['length']:.1f} km
+- Base delay: {prediction['base_delay']} minutes
+  _(longer routes = more delays)_
+
+**🌤️ Weather Impact:**
+- Today's weather: {prediction['weather']}
+- {weather_line}""")
+
+    with exp_col2:
+        time_impact = round((prediction['time_factor'] - 1) * 100)
+        if time_impact > 0:
+            time_line = f"Adds {time_impact}% more delay"
+        else:
+            time_line = "Good timing! No rush hour delays"
+        st.markdown(f"""**⏰ Time Impact:**
+- Current period: {prediction['time_period']}
+- {time_line}
+
+**🎲 Random Factors:**
+- Construction work
+- Traffic accidents
+- Extra passengers
+- Driver breaks""")
+    
+    # Delay breakdown chart
+    st.subheader("📊 Delay Breakdown")
+    
+    # Cached Arrow table: skips the dict -> DataFrame -> Arrow conversion
+    chart_data = factors_to_arrow(
+        prediction['base_delay'],
+        prediction['weather_factor'],
+        prediction['time_factor'],
+        delay
+    )
+
+    # Show chart
+    if sum(chart_data['Minutes'].to_pylist()) > 0:
+        st.bar_chart(chart_data, x='Factor', y='Minutes')
+    
+    # Tips for users
+    st.subheader("💡 Tips for Your Journey")
+    
+    if delay <= 2:
+        st.success("✅ Great timing! Your bus should be on schedule.")
+    elif delay <= 5:
+        st.warning("⚠️ Minor delays possible. Consider leaving 5 minutes early.")
+    elif delay <= 10:
+        st.warning("⚠️ Moderate delays expected. Leave 10-15 minutes early.")
+    else:
+        st.error("🚨 Significant delays likely. Consider alternate routes or leave much earlier.")
+    
+    # Departure recommendation
+    if delay > 2:
+        st.info(f"💡 **Recommendation:** Leave {delay + 5} minutes earlier than usual to arrive on time!")
+
+# Main app
+def main():
+    # App title
+    st.title("🚌 Waterloo Region Bus Delay Predictor")
+    st.write("Find out how late your bus might be today!")
+    
+    # Load data
+    routes_data, stops_count = load_bus_data()
+    
+    if routes_data is None:
+        st.stop()  # Stop if no data
+    
+    # Sidebar info
+    st.sidebar.header("📊 Data Info")
+    st.sidebar.write(f"📍 Total bus routes: {len(routes_data)}")
+    st.sidebar.write(f"🚏 Total bus stops: {stops_count}")
+    
+    # Create two columns
+    col1, col2 = st.columns([1, 1])
+    
+    with col1:
+        route_picker()  # Own fragment, reruns independently
+
+    with col2:
+        st.header("📈 Current Conditions")
+        
+        # Current time
+        current_time = datetime.now().strftime("%I:%M %p")
+        st.metric("🕐 Current Time", current_time)
+        
+        # Rush hour status
+        is_rush, time_period, time_factor = is_rush_hour(datetime.now().hour)
+        rush_color = "🔴" if is_rush else "🟢"
+        st.metric("⏰ Traffic Status", f"{rush_color} {time_period}")
+        
+        # Weather
+        weather, weather_factor = get_current_weather(weather_bucket())
+        st.metric("🌤️ Weather Impact", weather)
+    
+    # Show prediction results (own fragment, skips unrelated reruns)
+    if 'prediction' in st.session_state:
+        render_prediction(st.session_state.prediction, st.session_state.route_info)
+
+# Run the app
+if __name__ == "__main__":
+    main()